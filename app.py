@@ -1,18 +1,35 @@
 import streamlit as st
 import pandas as pd
-import requests
-import re
-import math
+import numpy as np
+import functools
+import codecs
 import html
-from urllib.parse import urlparse
-from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
+import os
+import tempfile
+from datetime import date, datetime, timedelta
 
 
 # Constants
 REPO_URL = "https://repo.anaconda.com/pkgs/snowflake/"
 CACHE_DURATION = timedelta(hours=1)
 ITEMS_PER_PAGE = 15
+PACKAGE_COLUMNS = ['package_name', 'version', 'documentation', 'development', 'license', 'summary']
+
+# App-owned directory for the on-disk copy of the parsed package data
+DISK_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'snowflake_conda_channel_explorer'
+)
+
+# Links are only rendered when they start with one of these prefixes
+ALLOWED_URL_PREFIXES = (
+    'https://repo.anaconda.com/',
+    'http://repo.anaconda.com/',
+    'https://github.com/',
+    'http://github.com/',
+    'https://docs.snowflake.com/',
+    'http://docs.snowflake.com/'
+)
 
 # CSP Headers - Define allowed sources
 CSP_POLICY = {
@@ -26,25 +43,12 @@ CSP_POLICY = {
     'form-action': "'self'"
 }
 
-def sanitize_url(url, allowed_domains=None):
-    """Sanitize and validate URLs against allowed domains."""
+@functools.lru_cache(maxsize=4096)
+def sanitize_url(url):
+    """Sanitize and validate URLs against allowed domain prefixes."""
     if not url:
         return ""
-    
-    if allowed_domains is None:
-        allowed_domains = {
-            'repo.anaconda.com',
-            'github.com',
-            'docs.snowflake.com'
-        }
-    
-    try:
-        parsed = urlparse(url)
-        if parsed.netloc in allowed_domains:
-            return url
-        return ""
-    except:
-        return ""
+    return url if url.startswith(ALLOWED_URL_PREFIXES) else ""
 
 def sanitize_text(text):
     """Sanitize text content to prevent XSS."""
@@ -52,107 +56,274 @@ def sanitize_text(text):
         return ""
     return html.escape(str(text))
 
+def escape_markup_series(series):
+    """Vectorized html.escape(..., quote=False) for a pandas string Series."""
+    return (series.str.replace('&', '&amp;', regex=False)
+                  .str.replace('<', '&lt;', regex=False)
+                  .str.replace('>', '&gt;', regex=False))
+
+@st.cache_resource
+def http_session():
+    """Return a shared HTTP session so keep-alive connections are reused."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=10))
+    session.headers['Accept-Encoding'] = 'gzip, deflate'
+    return session
+
+def disk_cache_path():
+    """Return today's on-disk cache file for the parsed package data."""
+    return os.path.join(DISK_CACHE_DIR, f"snowflake_pkgs_{date.today()}.parquet")
+
+def load_disk_cache(cache_path):
+    """Load parsed package data from disk if it is younger than CACHE_DURATION."""
+    try:
+        mtime = datetime.fromtimestamp(os.path.getmtime(cache_path))
+        if datetime.now() - mtime >= CACHE_DURATION:
+            return None
+        df = pd.read_parquet(cache_path)
+    except (ImportError, OSError, ValueError):
+        return None
+    
+    # Re-validate instead of trusting the file: same columns, non-null string
+    # values, allowlisted links and an already-escaped summary
+    if list(df.columns) != PACKAGE_COLUMNS or df.empty:
+        return None
+    if df[PACKAGE_COLUMNS].isna().any().any():
+        return None
+    if not all(pd.api.types.is_string_dtype(df[col]) for col in PACKAGE_COLUMNS):
+        return None
+    if df['summary'].str.contains('[<>]', regex=True).any():
+        return None
+    df['documentation'] = df['documentation'].map(sanitize_url)
+    df['development'] = df['development'].map(sanitize_url)
+    
+    df.attrs['fetched_at'] = mtime.isoformat()
+    return df
+
+def save_disk_cache(df, cache_path):
+    """Write parsed package data to disk; failures only cost a refetch later."""
+    tmp_path = None
+    try:
+        os.makedirs(DISK_CACHE_DIR, mode=0o700, exist_ok=True)
+        # Write to a private temp file and swap it in so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=DISK_CACHE_DIR, suffix='.tmp')
+        os.close(fd)
+        df.to_parquet(tmp_path, compression='zstd')
+        os.replace(tmp_path, cache_path)
+        tmp_path = None
+    except (ImportError, OSError, ValueError):
+        pass
+    finally:
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    prune_disk_cache(cache_path)
+
+def prune_disk_cache(keep_path):
+    """Remove cache files left over from earlier days."""
+    try:
+        names = os.listdir(DISK_CACHE_DIR)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(DISK_CACHE_DIR, name)
+        if (name.startswith('snowflake_pkgs_') and name.endswith('.parquet')
+                and path != keep_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def response_encoding(response):
+    """Return the declared charset if it is a known codec, else UTF-8."""
+    # Without a declared charset requests falls back to ISO-8859-1
+    content_type = response.headers.get('Content-Type', '').lower()
+    if 'charset' not in content_type or not response.encoding:
+        return 'utf-8'
+    try:
+        return codecs.lookup(response.encoding).name
+    except LookupError:
+        return 'utf-8'
+
 @st.cache_data(ttl=3600)  # Cache for 1 hour
 def fetch_package_data():
     """Fetch and parse package data from Snowflake's Anaconda channel."""
+    cache_path = disk_cache_path()
+    df = load_disk_cache(cache_path)
+    if df is not None:
+        return prepare_index(df)
+    
+    import lxml.etree
+    import requests
+
     try:
-        response = requests.get(REPO_URL, timeout=10)
-        response.raise_for_status()
-        return parse_package_data(response.text)
-    except requests.RequestException as e:
+        with http_session().get(REPO_URL, timeout=10, stream=True) as response:
+            response.raise_for_status()
+            df = parse_package_data(response.iter_content(chunk_size=65536), response_encoding(response))
+        if df.empty:
+            return df
+        df.attrs['fetched_at'] = datetime.now().isoformat()
+        save_disk_cache(df, cache_path)
+        return prepare_index(df)
+    except (requests.RequestException, lxml.etree.LxmlError, LookupError) as e:
         st.error(f"Error fetching package data: {sanitize_text(str(e))}")
         return pd.DataFrame()
 
-def parse_package_data(html_content):
-    """Parse the HTML content from Snowflake's Anaconda channel."""
-    soup = BeautifulSoup(html_content, 'html.parser')
-    packages = []
+def iter_table_rows(html_chunks, encoding=None):
+    """Incrementally parse HTML byte chunks, yielding each completed <tr>."""
+    import lxml.etree
+
+    parser = lxml.etree.HTMLPullParser(events=('end',), tag='tr', encoding=encoding)
+
+    def drain():
+        for _, row in parser.read_events():
+            yield row
+            # Drop the parsed row and its predecessors to keep memory bounded
+            row.clear()
+            while row.getprevious() is not None:
+                del row.getparent()[0]
+
+    for chunk in html_chunks:
+        parser.feed(chunk)
+        yield from drain()
+    parser.close()
+    yield from drain()
+
+def parse_package_data(html_chunks, encoding=None):
+    """
+    Parse the HTML content from Snowflake's Anaconda channel as it streams in.
+
+    html_chunks is an iterable of bytes chunks (e.g. response.iter_content()),
+    not a str; wrap a complete document in a list to parse it in one go.
+    """
+    def cell_text(cell):
+        return ''.join(cell.itertext()).strip()
+
+    names, versions, docs, devs, licenses, summaries = [], [], [], [], [], []
     
-    for row in soup.find_all('tr')[1:]:  # Skip header row
-        cols = row.find_all('td')
-        if not cols:
+    rows = iter_table_rows(html_chunks, encoding)
+    next(rows, None)  # Skip header row
+    for row in rows:
+        cols = row.findall('td')
+        # The channel index has a fixed 12-column schema; skip anything else
+        if len(cols) < 12:
             continue
             
         # Get and sanitize documentation and development links
-        doc_link = cols[2].find('a') if len(cols) > 2 else None
-        dev_link = cols[3].find('a') if len(cols) > 3 else None
+        doc_link = cols[2].find('a')
+        dev_link = cols[3].find('a')
         
-        package_info = {
-            'package_name': sanitize_text(cols[0].text.strip() if cols else ''),
-            'version': sanitize_text(cols[1].text.strip() if len(cols) > 1 else ''),
-            'documentation': sanitize_url(doc_link['href'] if doc_link else ''),
-            'development': sanitize_url(dev_link['href'] if dev_link else ''),
-            'license': sanitize_text(cols[4].text.strip() if len(cols) > 4 else ''),
-            'summary': sanitize_text(cols[11].text.strip() if len(cols) > 11 else '')
-        }
-        packages.append(package_info)
+        names.append(cell_text(cols[0]))
+        versions.append(cell_text(cols[1]))
+        docs.append(sanitize_url(doc_link.get('href', '') if doc_link is not None else ''))
+        devs.append(sanitize_url(dev_link.get('href', '') if dev_link is not None else ''))
+        licenses.append(cell_text(cols[4]))
+        summaries.append(cell_text(cols[11]))
     
-    return pd.DataFrame(packages)
-
-def filter_packages(df, search_term, license_filter):
+    # No data rows: empty lists would give non-string columns
+    if not names:
+        return pd.DataFrame()
+    
+    df = pd.DataFrame({
+        'package_name': names,
+        'version': versions,
+        'documentation': docs,
+        'development': devs,
+        'license': licenses,
+        'summary': summaries
+    })
+    # Only the free-text summary is rendered as markdown, so escape it once here
+    df['summary'] = escape_markup_series(df['summary'])
+    return df
+
+def prepare_index(df):
+    """Add lowercased search columns and a categorical license column."""
+    df['license'] = df['license'].astype('category')
+    df['package_name_lc'] = df['package_name'].str.lower()
+    df['summary_lc'] = df['summary'].str.lower()
+    return df
+
+def filter_mask(df, search_term, license_filter):
     """
-    Filter packages based on search criteria with secure text handling
+    Build the boolean row mask for the search criteria, or None if unfiltered
     """
-    # Create a copy to avoid modifying original
-    filtered_df = df.copy()
+    mask = None
     
     # Apply search filter if term exists
     if search_term:
-        # Sanitize search term and create case-insensitive pattern
-        safe_search_term = re.escape(sanitize_text(search_term))
-        pattern = re.compile(safe_search_term, re.IGNORECASE)
+        # Match as a plain lowercase substring; summaries are stored escaped
+        term = search_term.lower()
+        summary_term = html.escape(term, quote=False)
         
         # Apply search to both package name and summary
         mask = (
-            filtered_df['package_name'].str.contains(pattern, na=False) |
-            filtered_df['summary'].str.contains(pattern, na=False)
+            df['package_name_lc'].str.contains(term, regex=False, na=False) |
+            df['summary_lc'].str.contains(summary_term, regex=False, na=False)
         )
-        filtered_df = filtered_df[mask]
     
     # Apply license filter if not "All"
     if license_filter != "All":
-        # Sanitize license filter
-        safe_license = sanitize_text(license_filter)
-        filtered_df = filtered_df[filtered_df['license'] == safe_license]
+        # license_filter comes from the known license categories
+        license_mask = df['license'] == license_filter
+        mask = license_mask if mask is None else mask & license_mask
     
-    return filtered_df
+    return mask
+
+@st.cache_data(show_spinner=False, ttl=CACHE_DURATION, max_entries=256)
+def _filtered_indices(_df, data_version, search_term, license_filter):
+    """Return the row positions matching the filters, memoized per data version."""
+    mask = filter_mask(_df, search_term, license_filter)
+    if mask is None:
+        return np.arange(len(_df))
+    return np.flatnonzero(mask.to_numpy())
+
+@st.cache_data(show_spinner=False, ttl=CACHE_DURATION, max_entries=4)
+def compute_sidebar_stats(_df, data_version):
+    """Return the sorted licenses, package count and unique license count."""
+    licenses = _df['license'].cat.categories.tolist()
+    return licenses, len(_df), len(licenses)
 
 def create_package_card(pkg):
     """Create a safe package display card without HTML injection."""
-    st.header(f"📦 {pkg['package_name']}")
+    st.header(f"📦 {pkg.package_name}")
     
     # Description and basic info
     st.subheader("Description")
-    st.info(f"{pkg['summary']}")
-    st.markdown(f"**Latest Version**: `{pkg['version']}`")  # Made version display more explicit
-    st.markdown(f"**License**: `{pkg['license']}`")
+    st.info(f"{pkg.summary}")
+    st.markdown(f"**Latest Version**: `{pkg.version}`")  # Made version display more explicit
+    st.markdown(f"**License**: `{pkg.license}`")
     
     # Installation commands
     st.subheader("Installation Commands")
    
-    pip_cmd = f"pip install {pkg['package_name']}"
-    conda_cmd = f"conda install -c snowflake {pkg['package_name']}"
+    pip_cmd = f"pip install {pkg.package_name}"
+    conda_cmd = f"conda install -c snowflake {pkg.package_name}"
     
     col1, col2 = st.columns(2)
     with col1:
         st.code(pip_cmd, language="bash")
-        st.caption("For specific version: " + f"pip install {pkg['package_name']}=={pkg['version']}")
-        # if st.button(f"Copy pip command ({pkg['package_name']})"):
-        #     st.session_state[f"clipboard_{pkg['package_name']}_pip"] = pip_cmd
+        st.caption("For specific version: " + f"pip install {pkg.package_name}=={pkg.version}")
+        # if st.button(f"Copy pip command ({pkg.package_name})"):
+        #     st.session_state[f"clipboard_{pkg.package_name}_pip"] = pip_cmd
     
     with col2:
         st.code(conda_cmd, language="bash")
-        st.caption("For specific version: " + f"conda install -c snowflake {pkg['package_name']}=={pkg['version']}")
-        # if st.button(f"Copy conda command ({pkg['package_name']})"):
-        #     st.session_state[f"clipboard_{pkg['package_name']}_conda"] = conda_cmd
+        st.caption("For specific version: " + f"conda install -c snowflake {pkg.package_name}=={pkg.version}")
+        # if st.button(f"Copy conda command ({pkg.package_name})"):
+        #     st.session_state[f"clipboard_{pkg.package_name}_conda"] = conda_cmd
     
     # Links
-    if pkg['documentation'] or pkg['development']:
+    if pkg.documentation or pkg.development:
         st.subheader("Links")
-        if pkg['documentation']:
-            st.link_button("📖 Documentation", pkg['documentation'], use_container_width=True)
-        if pkg['development']:
-            st.link_button("💻 Source Code", pkg['development'], use_container_width=True)
+        if pkg.documentation:
+            st.link_button("📖 Documentation", pkg.documentation, use_container_width=True)
+        if pkg.development:
+            st.link_button("💻 Source Code", pkg.development, use_container_width=True)
 
     # Add note about usage
     st.info("""Note: 
@@ -263,6 +434,7 @@ order by 2, 3, 1;
     if df.empty:
         st.error("Unable to load package data. Please try again later.")
         return
+    data_version = df.attrs.get('fetched_at')
 
     # Sidebar filters
     with st.sidebar:
@@ -274,15 +446,16 @@ order by 2, 3, 1;
             help='Seach package names and package descriptions.',
         )
         
-        licenses = ["All"] + sorted(df['license'].unique().tolist())
+        licenses_sorted, total_count, unique_licenses = compute_sidebar_stats(df, data_version)
+        licenses = ["All"] + licenses_sorted
         license_filter = st.selectbox("License", licenses)
         
         st.divider()
         
         # Statistics
         st.subheader("Statistics")
-        st.metric("Total Packages", len(df))
-        st.metric("Unique Licenses", len(df['license'].unique()))
+        st.metric("Total Packages", total_count)
+        st.metric("Unique Licenses", unique_licenses)
 
         # Helpful links
         st.subheader("Useful Links")
@@ -300,11 +473,11 @@ order by 2, 3, 1;
         st.session_state.last_license = license_filter
 
     # Apply filters and display results
-    filtered_df = filter_packages(df, search_term, license_filter)
+    filtered_df = df.iloc[_filtered_indices(df, data_version, search_term, license_filter)]
 
     # Pagination
     total_items = len(filtered_df)
-    total_pages = math.ceil(total_items / ITEMS_PER_PAGE)
+    total_pages = -(-total_items // ITEMS_PER_PAGE)
     start_idx = (st.session_state.current_page - 1) * ITEMS_PER_PAGE
     end_idx = start_idx + ITEMS_PER_PAGE
 
@@ -328,8 +501,8 @@ order by 2, 3, 1;
 
     # Display packages
     page_df = filtered_df.iloc[start_idx:end_idx]
-    for _, pkg in page_df.iterrows():
-        with st.expander(f"📦 {sanitize_text(pkg['package_name'])}"):
+    for pkg in page_df.itertuples(index=False):
+        with st.expander(f"📦 {sanitize_text(pkg.package_name)}"):
             create_package_card(pkg)
 
     # Footer